@@ -0,0 +1,106 @@
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from typing import Awaitable, Callable, Hashable
+import asyncio
+import math
+import time
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one computation.
+    Callers that arrive while a computation is in flight await its result instead of starting their own.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        task = self._in_flight.get(key)
+        if task is None:
+            # Run as a task so a disconnecting caller doesn't cancel the work for everyone else
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            print(f"Coalescing request with in-flight computation for {key!r}")
+        return await asyncio.shield(task)
+
+
+class AdmissionRejected(HTTPException):
+    """Raised when a request is turned away; background callers catch it and skip their work."""
+
+
+class AdmissionController:
+    """
+    Bounds in-flight work for one endpoint and rejects requests early when the queue is too deep
+    or the estimated wait is too long, instead of letting them time out.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait_seconds: float,
+                 initial_service_time: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self.waiting = 0
+        # Exponentially weighted moving average of how long one admitted request takes
+        self.avg_service_time = initial_service_time
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def estimated_wait(self) -> float:
+        if self.in_flight < self.max_concurrent:
+            return 0.0
+        return (self.waiting + 1) / self.max_concurrent * self.avg_service_time
+
+    def _reject(self, status_code: int, reason: str):
+        retry_after = max(1, math.ceil(self.estimated_wait()))
+        print(f"⚠️ Rejecting {self.name} request: {reason}")
+        raise AdmissionRejected(
+            status_code=status_code,
+            detail=f"The {self.name} service is busy, please retry shortly.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    async def _acquire(self):
+        if not self._semaphore.locked():
+            # A free slot is taken without yielding, so a burst isn't counted as queued
+            await self._semaphore.acquire()
+            return
+
+        # Only requests that really have to wait count against the queue and the timeout
+        if self.waiting >= self.max_queue:
+            self._reject(429, f"queue depth {self.waiting} reached limit {self.max_queue}")
+        if self.estimated_wait() > self.max_wait_seconds:
+            self._reject(503, f"estimated wait {self.estimated_wait():.1f}s exceeds {self.max_wait_seconds}s")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self._reject(503, "timed out waiting for a slot")
+        finally:
+            self.waiting -= 1
+
+    @asynccontextmanager
+    async def admit(self):
+        await self._acquire()
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * (time.perf_counter() - start)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+def normalize_key(text: str) -> str:
+    """Normalizes user input so trivially different spellings of the same request share a key."""
+    return " ".join(text.lower().split())
@@ -0,0 +1,191 @@
+from google import genai
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from backend.db.database import AsyncSessionLocal
+from backend.db.models import ConversationArchive, ConversationHistory, ConversationSummary
+from backend.db.write_behind import conversation_writer
+from backend.read_cache import read_cache
+from backend.admission import AdmissionController, AdmissionRejected
+import asyncio
+import contextlib
+import os
+import re
+import dotenv
+
+dotenv.load_dotenv()
+
+# The conversation is a single thread, so its summary lives in one row
+SUMMARY_ID = 1
+
+# Matches citation links added by TrainerAgent.add_citations, e.g. "[1](https://...), [2](https://...)"
+CITATION_PATTERN = re.compile(r"(,\s*)?\[\d+\]\([^)]*\)")
+
+
+def strip_citations(text: str) -> str:
+    """Removes inline citation links, which are noise when an answer is fed back into a prompt."""
+    return CITATION_PATTERN.sub("", text)
+
+
+async def get_conversation_summary(db: AsyncSession) -> str:
+    """Returns the rolling summary of the archived conversation, or an empty string."""
+    summary = await db.get(ConversationSummary, SUMMARY_ID)
+    return summary.summary if summary else ""
+
+
+async def get_recent_messages(db: AsyncSession, limit: int, sender: str | None = None) -> list[ConversationHistory]:
+    """
+    Returns the last `limit` messages (optionally from one sender), oldest first,
+    including messages still buffered by the conversation writer.
+    """
+    # Snapshot the buffer before querying so a flush in between can't hide a message
+    pending = conversation_writer.pending(sender)
+    stmt = select(ConversationHistory).order_by(ConversationHistory.id.desc()).limit(limit)
+    if sender:
+        stmt = stmt.where(ConversationHistory.sender == sender)
+    result = await db.execute(stmt)
+    messages = list(reversed(result.scalars().all()))
+
+    flushed = {msg.client_id for msg in messages}
+    messages += [ConversationHistory(**m) for m in pending if m["client_id"] not in flushed]
+    return messages[-limit:]
+
+
+def format_messages(messages: list[ConversationHistory]) -> str:
+    return "\n".join([f"{msg.sender}: {strip_citations(msg.content)}" for msg in messages])
+
+
+class CompactionAgent:
+    def __init__(self, keep_recent=6, min_batch=10, max_batch=50, admission: AdmissionController | None = None):
+        google_api_key = os.getenv("GOOGLE_API_KEY")
+        self.client = genai.Client(api_key=google_api_key)
+        self.model = 'gemini-2.5-flash'
+        # Messages inside the recent window are never compacted
+        self.keep_recent = keep_recent
+        # Only call the LLM once enough old messages have piled up
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.admission = admission
+        # Only one compaction runs at a time in this process
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def schedule(self):
+        """Starts a background compaction with its own session unless one is already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.compact(db)
+        except Exception as e:
+            print(f"❌ Compaction Agent failed: {e}")
+
+    async def compact(self, db: AsyncSession):
+        """
+        Folds messages older than the recent window into the rolling summary
+        and moves them from conversation_history to conversation_archive.
+        """
+        async with self._lock:
+            await self._compact(db)
+
+    async def _compact(self, db: AsyncSession):
+        # 1. Read the oldest messages outside the recent window, then end the transaction
+        # so no connection sits idle holding locks while waiting for admission and Gemini
+        cutoff_stmt = (
+            select(ConversationHistory.id)
+            .order_by(ConversationHistory.id.desc())
+            .offset(self.keep_recent)
+            .limit(1)
+        )
+        cutoff_id = (await db.execute(cutoff_stmt)).scalar()
+        if cutoff_id is None:
+            await db.rollback()
+            return
+
+        stmt = (
+            select(ConversationHistory)
+            .where(ConversationHistory.id <= cutoff_id)
+            .order_by(ConversationHistory.id)
+            .limit(self.max_batch)
+        )
+        old_messages = (await db.execute(stmt)).scalars().all()
+        summary_row = await db.get(ConversationSummary, SUMMARY_ID)
+        previous_summary = summary_row.summary if summary_row else ""
+        previous_compacted = summary_row.messages_compacted if summary_row else 0
+        await db.rollback()
+        if len(old_messages) < self.min_batch:
+            return
+
+        # 2. Update the summary incrementally from the previous summary and the new messages
+        prompt = f"""
+        You maintain a running summary of a learning conversation between a user and a learning portal.
+        Update the summary so it also covers the new messages below.
+
+        **Current Summary:**
+        {previous_summary or "(empty)"}
+
+        **New Messages:**
+        {format_messages(old_messages)}
+
+        **Instructions:**
+        - Keep the questions the user asked, the key facts explained, and any open threads.
+        - Drop greetings, repetition and links.
+        - Keep the summary under 200 words and output only the summary text.
+        """
+        try:
+            async with self.admission.admit() if self.admission else contextlib.nullcontext():
+                response = await asyncio.to_thread(
+                    self.client.models.generate_content,
+                    contents=prompt,
+                    model=self.model
+                )
+            new_summary = response.text.strip()
+        except AdmissionRejected:
+            # The messages stay in place and are picked up by a later compaction
+            print("⚠️ Compaction Agent skipped: too much Gemini work in flight.")
+            return
+        except Exception as e:
+            print(f"❌ Compaction Agent failed to update summary: {e}")
+            return
+
+        # 3. Store the summary and move the raw messages to the archive in one short transaction,
+        # giving up if another worker compacted in the meantime
+        try:
+            summary_stmt = select(ConversationSummary).where(ConversationSummary.id == SUMMARY_ID).with_for_update()
+            summary_row = (await db.execute(summary_stmt)).scalar_one_or_none()
+            current_compacted = summary_row.messages_compacted if summary_row else 0
+            if current_compacted != previous_compacted:
+                print("⚠️ Compaction Agent skipped: the summary changed while it was being rewritten.")
+                await db.rollback()
+                return
+
+            claimed_ids = [msg.id for msg in old_messages]
+            deleted = (await db.execute(
+                delete(ConversationHistory)
+                .where(ConversationHistory.id.in_(claimed_ids))
+                .returning(ConversationHistory.id, ConversationHistory.sender,
+                           ConversationHistory.content, ConversationHistory.timestamp)
+            )).all()
+            if len(deleted) != len(claimed_ids):
+                print("⚠️ Compaction Agent skipped: some messages were already archived elsewhere.")
+                await db.rollback()
+                return
+
+            await db.execute(insert(ConversationArchive).values([
+                dict(id=row.id, sender=row.sender, content=row.content, timestamp=row.timestamp)
+                for row in deleted
+            ]))
+            if summary_row is None:
+                summary_row = ConversationSummary(id=SUMMARY_ID, summary="", messages_compacted=0)
+                db.add(summary_row)
+            summary_row.summary = new_summary
+            summary_row.messages_compacted = current_compacted + len(deleted)
+            await db.commit()
+        except Exception:
+            # E.g. two workers creating the first summary row at once; the loser retries later
+            await db.rollback()
+            raise
+        read_cache.invalidate("history")
+        print(f"✅ Compaction Agent archived {len(deleted)} messages.")
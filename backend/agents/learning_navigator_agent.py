@@ -2,7 +2,11 @@ from google import genai
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from backend.db.models import LearningTopic
-from backend.db.models import ConversationHistory
+from backend.agents.compaction_agent import get_conversation_summary, get_recent_messages
+from backend.retrieval.topic_map import TopicMap
+from backend.admission import AdmissionController, AdmissionRejected
+import asyncio
+import contextlib
 import os
 import dotenv
 
@@ -10,15 +14,52 @@ dotenv.load_dotenv()
 
 
 class LearningNavigatorAgent:
-    def __init__(self):
+    def __init__(self, topic_map: TopicMap | None = None, embedding_model=None, embed_query=None, use_llm=False,
+                 admission: AdmissionController | None = None):
         google_api_key = os.getenv("GOOGLE_API_KEY")
         self.client = genai.Client(api_key=google_api_key)
         self.model = 'gemini-2.5-flash'
+        # Suggestions come from the corpus topic map unless the LLM navigator is requested
+        self.topic_map = topic_map
+        self.embedding_model = embedding_model
+        # Shared with the trainer so the query isn't embedded twice per chat
+        self.embed_query = embed_query or (embedding_model.embed_query if embedding_model else None)
+        self.use_llm = use_llm
+        self._topic_embeddings: dict[str, list[float]] = {}
+        # Bounds the LLM calls together with the rest of the chat endpoint's Gemini work
+        self.admission = admission
 
-    async def suggest_next_steps(self, db: AsyncSession) -> list[str]:
+    async def suggest_next_steps(self, db: AsyncSession, user_query: str | None = None) -> list[str]:
         """
         Provides four targeted prompts for the user to explore next.
         """
+        if not self.use_llm and user_query and self.topic_map and self.topic_map.ready:
+            suggestions = await self.suggest_from_topic_map(db, user_query)
+            if suggestions:
+                return suggestions
+        return await self.suggest_with_llm(db)
+
+    async def suggest_from_topic_map(self, db: AsyncSession, user_query: str) -> list[str]:
+        """
+        Suggests the corpus clusters nearest to the query that the learner's topics don't cover yet,
+        without calling the LLM.
+        """
+        stmt = select(LearningTopic.topic).order_by(LearningTopic.created_at.desc()).limit(20)
+        result = await db.execute(stmt)
+        topics = result.scalars().all()
+
+        missing = [t for t in topics if t not in self._topic_embeddings]
+        if missing:
+            self._topic_embeddings.update(zip(missing, self.embedding_model.embed_documents(missing)))
+        explored = [self._topic_embeddings[t] for t in topics]
+
+        query_embedding = self.embed_query(user_query)
+        return self.topic_map.suggest(query_embedding, explored)
+
+    async def suggest_with_llm(self, db: AsyncSession) -> list[str]:
+        """
+        Asks Gemini for four next-step questions based on the conversation and learned topics.
+        """
         # 1. Get all learned topics
         stmt = (
             select(LearningTopic)
@@ -29,21 +70,18 @@ class LearningNavigatorAgent:
         topics = result.scalars().all()
         learned_topics = ", ".join([t.topic for t in topics])
 
-        # 2. Get last up to 5 user messages
-        user_stmt = (
-            select(ConversationHistory)
-            .where(ConversationHistory.sender == "user")
-            .order_by(ConversationHistory.timestamp.desc())
-            .limit(5)
-        )
-        user_result = await db.execute(user_stmt)
-        user_messages = user_result.scalars().all()
-        recent_user_text = "\n".join([msg.content for msg in reversed(user_messages)])
+        # 2. Get the rolling summary and the last up to 3 user messages
+        conversation_summary = await get_conversation_summary(db)
+        user_messages = await get_recent_messages(db, limit=3, sender="user")
+        recent_user_text = "\n".join([msg.content for msg in user_messages])
 
         # 2. Construct the prompt
         prompt = f"""
         You are a learning navigator. Based on the user's recent messages and the topics already covered, suggest four engaging and logical next-step questions to deepen the user's understanding.
 
+        **Conversation So Far:**
+        {conversation_summary}
+
         **Recent User Messages:**
         {recent_user_text}
         
@@ -56,7 +94,15 @@ class LearningNavigatorAgent:
         - Do not number them. Use a hyphen (-) for each suggestion.
         """
 
-        # 3. Call Gemini and parse the response
-        response = self.client.models.generate_content(model=self.model, contents=prompt)
+        # 3. Call Gemini and parse the response; under load the chat goes out without suggestions
+        try:
+            async with self.admission.admit() if self.admission else contextlib.nullcontext():
+                response = await asyncio.to_thread(
+                    self.client.models.generate_content,
+                    model=self.model,
+                    contents=prompt
+                )
+        except AdmissionRejected:
+            return []
         suggestions = [line.replace('-', '').strip() for line in response.text.strip().split('\n')]
         return suggestions[:4]  # Ensure only 4 are returned
\ No newline at end of file
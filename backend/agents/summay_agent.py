@@ -1,8 +1,12 @@
 from google import genai
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from sqlalchemy.dialects.postgresql import insert
-from backend.db.models import ConversationHistory, LearningTopic
+from backend.db.models import LearningTopic
+from backend.read_cache import read_cache
+from backend.admission import AdmissionController, AdmissionRejected
+from backend.agents.compaction_agent import get_conversation_summary, get_recent_messages, format_messages
+import asyncio
+import contextlib
 import os
 import dotenv
 
@@ -10,20 +14,20 @@ dotenv.load_dotenv()
 
 
 class SummaryAgent:
-    def __init__(self):
+    def __init__(self, admission: AdmissionController | None = None):
         google_api_key = os.getenv("GOOGLE_API_KEY")
         self.client = genai.Client(api_key=google_api_key)
         self.model = 'gemini-2.5-flash'
+        self.admission = admission
 
     async def summarize_conversation(self, db: AsyncSession):
         """
         Analyzes recent conversation and updates the learning_topics table.
         """
-        # 1. Get recent conversation
-        stmt = select(ConversationHistory).order_by(ConversationHistory.timestamp.desc()).limit(10)
-        result = await db.execute(stmt)
-        history = result.scalars().all()
-        conversation_text = "\n".join([f"{msg.sender}: {msg.content}" for msg in reversed(history)])
+        # 1. Get the rolling summary and the recent conversation
+        conversation_summary = await get_conversation_summary(db)
+        history = await get_recent_messages(db, limit=10)
+        conversation_text = format_messages(history)
 
         # 2. Construct the prompt
         prompt = f"""
@@ -34,12 +38,24 @@ class SummaryAgent:
         Topic: [The main topic]
         Description: [A one-sentence summary of what was learned]
 
+        **Earlier Conversation (summary, for context only):**
+        {conversation_summary}
+
         **Conversation:**
         {conversation_text}
         """
 
-        # 3. Call the Gemini API
-        response = self.client.models.generate_content(model=self.model, contents=prompt)
+        # 3. Call the Gemini API, skipping this round if the Gemini budget is exhausted
+        try:
+            async with self.admission.admit() if self.admission else contextlib.nullcontext():
+                response = await asyncio.to_thread(
+                    self.client.models.generate_content,
+                    model=self.model,
+                    contents=prompt
+                )
+        except AdmissionRejected:
+            print("⚠️ Summary Agent skipped: too much Gemini work in flight.")
+            return
 
         # 4. Parse the response and upsert into the database
         try:
@@ -58,6 +74,7 @@ class SummaryAgent:
                 )
                 await db.execute(stmt)
                 await db.commit()
+                read_cache.invalidate("topics")
                 print(f"✅ Summary Agent updated topic: {topic}")
         except Exception as e:
             print(f"❌ Summary Agent failed to parse or update: {e}")
\ No newline at end of file
@@ -3,8 +3,14 @@ from google.genai import types
 from pymilvus import Collection
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from backend.db.models import ConversationHistory, LearningTopic
+from backend.db.models import LearningTopic
+from backend.agents.compaction_agent import get_conversation_summary, get_recent_messages, format_messages
 from langchain.embeddings.huggingface import HuggingFaceEmbeddings
+from backend.retrieval.reranker import CrossEncoderReranker
+from backend.retrieval.partitions import DEFAULT_PARTITION, PartitionManager, partition_name
+from collections import OrderedDict
+import asyncio
+import json
 import os
 import dotenv
 
@@ -12,14 +18,34 @@ dotenv.load_dotenv()
 
 
 class TrainerAgent:
-    def __init__(self, milvus_collection: Collection, embedding_model="sentence-transformers/all-mpnet-base-v2"):
+    def __init__(self, milvus_collection: Collection, embedding_model="sentence-transformers/all-mpnet-base-v2",
+                 reranker: CrossEncoderReranker | None = None, candidate_k=50, recent_messages=6,
+                 partitions: PartitionManager | None = None):
         google_api_key = os.getenv("GOOGLE_API_KEY")
         self.client = genai.Client(api_key=google_api_key)
         self.grounding_tool = types.Tool(google_search=types.GoogleSearch())
         self.model = "gemini-2.5-pro"
         self.config = types.GenerateContentConfig(tools=[self.grounding_tool])
         self.milvus_collection = milvus_collection
+        # Partitions are loaded on first use and released when idle
+        self.partitions = partitions or PartitionManager(milvus_collection)
         self.embedding_model = HuggingFaceEmbeddings(model_name=embedding_model)
+        # Optional second stage: over-fetch candidates and rerank them with a cross-encoder
+        self.reranker = reranker
+        self.candidate_k = candidate_k
+        self.recent_messages = recent_messages
+        # Recent query embeddings, so the navigator can reuse the one computed for retrieval
+        self._query_embeddings: OrderedDict[str, list[float]] = OrderedDict()
+
+    def embed_query(self, query: str) -> list[float]:
+        """Embeds a query, reusing the embedding if the same query was embedded recently."""
+        embedding = self._query_embeddings.get(query)
+        if embedding is None:
+            embedding = self.embedding_model.embed_query(query)
+            self._query_embeddings[query] = embedding
+            if len(self._query_embeddings) > 256:
+                self._query_embeddings.popitem(last=False)
+        return embedding
 
     def add_citations(self, response):
         text = response.text
@@ -44,27 +70,45 @@ class TrainerAgent:
 
         return text
 
-    async def answer_query(self, db: AsyncSession, user_query: str) -> str:
+    async def answer_query(self, db: AsyncSession, user_query: str, source_type: str | None = None,
+                           source_identifier: str | None = None) -> str:
         """
         Answers a user's query using RAG and Google Search grounding.
+        Optional source filters restrict retrieval to the matching partition and source.
         """
-        # 1. Retrieve context from Milvus
-        query_embedding = self.embedding_model.embed_query(user_query)
+        # 1. Retrieve context from Milvus, probing only the partitions in scope
+        if source_type:
+            partitions = [partition_name(source_type), DEFAULT_PARTITION]
+            filters = [f"source_type == {json.dumps(source_type)}"]
+        else:
+            partitions = self.partitions.all_partitions()
+            filters = []
+        if source_identifier:
+            filters.append(f"source_identifier == {json.dumps(source_identifier)}")
+        partitions = self.partitions.acquire(partitions)
+
+        query_embedding = self.embed_query(user_query)
         search_params = {"metric_type": "L2", "params": {"nprobe": 10}}
         results = self.milvus_collection.search(
             data=[query_embedding],
             anns_field="embedding",
             param=search_params,
-            limit=5,
+            limit=self.candidate_k if self.reranker else 5,
+            expr=" and ".join(filters) or None,
+            partition_names=partitions,
             output_fields=["passage"]
         )
-        retrieved_context = "\n".join([res.entity.get('passage') for res in results[0]])
-
-        # 2. Retrieve conversation history (short-term memory)
-        stmt = select(ConversationHistory).order_by(ConversationHistory.timestamp.desc()).limit(10)
-        result = await db.execute(stmt)
-        history = result.scalars().all()
-        conversation_history = "\n".join([f"{msg.sender}: {msg.content}" for msg in reversed(history)])
+        if self.reranker:
+            candidates = [(res.id, res.entity.get('passage')) for res in results[0]]
+            passages = await self.reranker.rerank(user_query, candidates)
+        else:
+            passages = [res.entity.get('passage') for res in results[0]]
+        retrieved_context = "\n".join(passages)
+
+        # 2. Retrieve conversation history (short-term memory): rolling summary plus the last few turns
+        conversation_summary = await get_conversation_summary(db)
+        history = await get_recent_messages(db, limit=self.recent_messages)
+        conversation_history = format_messages(history)
 
         # 3. Retrieve learned topics (long-term memory)
         stmt_topics = select(LearningTopic)
@@ -84,6 +128,11 @@ class TrainerAgent:
         {retrieved_context}
         </retrieved_context>
 
+        **Here is a summary of our earlier conversation:**
+        <conversation_summary>
+        {conversation_summary}
+        </conversation_summary>
+
         **Here is our recent conversation history:**
         <conversation_history>
         {conversation_history}
@@ -101,8 +150,11 @@ class TrainerAgent:
         """
 
         # 5. Call the Gemini API
-        response = self.client.models.generate_content(model=self.model,
+        response = await asyncio.to_thread(
+            self.client.models.generate_content,
+            model=self.model,
             contents=prompt,
-            config=self.config)
+            config=self.config
+        )
         text_with_citations = self.add_citations(response)
         return text_with_citations
\ No newline at end of file
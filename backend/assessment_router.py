@@ -6,6 +6,8 @@ import uuid
 from sqlalchemy.future import select
 
 from backend.db.deps import get_db
+from backend.read_cache import read_cache
+from backend.admission import AdmissionController, SingleFlight, normalize_key
 from backend.agents.assessment_agent import AssessmentAgent
 from backend.db.models import Quiz, QuizQuestion
 
@@ -49,6 +51,9 @@ class StartQuizResponse(BaseModel):
 # --- Router Setup ---
 router = APIRouter(prefix="/assessment", tags=["Assessment"])
 assessment_agent = AssessmentAgent()
+quiz_flight = SingleFlight()
+quiz_admission = AdmissionController("assessment", max_concurrent=2, max_queue=8, max_wait_seconds=30,
+                                     initial_service_time=10)
 
 
 @router.post("/start", response_model=StartQuizResponse)
@@ -57,7 +62,12 @@ async def start_quiz(request: StartQuizRequest, db: AsyncSession = Depends(get_d
     Starts a new quiz on a given topic.
     """
     # 1. Generate quiz content using the Assessment Agent
-    quiz_data = await assessment_agent.create_quiz(request.topic)
+    # Concurrent requests for the same topic share one generated quiz
+    async def generate():
+        async with quiz_admission.admit():
+            return await assessment_agent.create_quiz(request.topic)
+
+    quiz_data = await quiz_flight.do(normalize_key(request.topic), generate)
     if not quiz_data or not quiz_data.get("questions"):
         raise HTTPException(status_code=500, detail="Failed to generate quiz content.")
 
@@ -80,6 +90,7 @@ async def start_quiz(request: StartQuizRequest, db: AsyncSession = Depends(get_d
         )
     db.add_all(questions_to_add)
     await db.commit()
+    read_cache.invalidate("quizzes")
 
     # Assemble the full quiz object to send to the frontend
     quiz_data_model = QuizDataModel(
@@ -3,7 +3,25 @@ CREATE TABLE conversation_history (
     id SERIAL PRIMARY KEY,
     sender VARCHAR(50) NOT NULL, -- 'user' or 'portal'
     content TEXT NOT NULL,
-    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    client_id UUID UNIQUE -- assigned by the write-behind buffer
+);
+
+-- Archive for raw messages that have been folded into the rolling summary
+CREATE TABLE conversation_archive (
+    id INTEGER PRIMARY KEY, -- keeps the original conversation_history id
+    sender VARCHAR(50) NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TIMESTAMPTZ,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Single-row rolling summary of the archived conversation
+CREATE TABLE conversation_summary (
+    id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    messages_compacted INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
 -- Table for long-term memory of topics covered
@@ -20,6 +38,7 @@ CREATE TABLE quizzes (
     topic VARCHAR(255) NOT NULL,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
+CREATE INDEX ix_quizzes_created_at_id ON quizzes (created_at, id);
 
 -- Table for quiz questions
 CREATE TABLE quiz_questions (
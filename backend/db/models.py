@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, TEXT, Integer, ForeignKey
+from sqlalchemy import String, DateTime, TEXT, Integer, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from backend.db.database import Base
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -14,6 +14,27 @@ class ConversationHistory(Base):
     sender: Mapped[str] = mapped_column(String(50), nullable=False)
     content: Mapped[str] = mapped_column(TEXT, nullable=False)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Assigned by the conversation writer before the row exists, to match buffered and stored copies
+    client_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), unique=True, nullable=True)
+
+class ConversationArchive(Base):
+    """Raw messages moved out of conversation_history once they are folded into the summary."""
+    __tablename__ = "conversation_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sender: Mapped[str] = mapped_column(String(50), nullable=False)
+    content: Mapped[str] = mapped_column(TEXT, nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class ConversationSummary(Base):
+    """Rolling summary of everything that has been archived from the conversation."""
+    __tablename__ = "conversation_summary"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    summary: Mapped[str] = mapped_column(TEXT, nullable=False, default="")
+    messages_compacted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class LearningTopic(Base):
     __tablename__ = "learning_topics"
@@ -26,6 +47,9 @@ class LearningTopic(Base):
 
 class Quiz(Base):
     __tablename__ = "quizzes"
+    # Supports newest-first keyset pagination of past quizzes
+    __table_args__ = (Index("ix_quizzes_created_at_id", "created_at", "id"),)
+
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     topic: Mapped[str] = mapped_column(String(255), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
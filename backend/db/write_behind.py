@@ -0,0 +1,145 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from backend.db.database import AsyncSessionLocal
+from backend.db.models import ConversationHistory
+from backend.read_cache import read_cache
+import asyncio
+import json
+import uuid
+
+# Errors that mean the database is unreachable rather than that a row is bad
+OUTAGE_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+
+class ConversationMessage(BaseModel):
+    """A message waiting to be written, validated up front so it can't fail a batch."""
+    # Assigned here so buffered and flushed copies of a message can be matched
+    client_id: uuid.UUID = Field(default_factory=uuid.uuid4)
+    sender: str = Field(min_length=1, max_length=50)
+    content: str
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ConversationWriter:
+    """
+    Buffers conversation messages and writes them in batched multi-row inserts,
+    either every `flush_interval` seconds or as soon as `max_batch` messages are waiting.
+    Rows that can't be written are appended to a dead-letter file instead of blocking later batches.
+    """
+
+    def __init__(self, flush_interval=0.5, max_batch=50, max_buffer=10000,
+                 dead_letter_path="conversation_dead_letter.jsonl"):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # Bounds memory while the database is down; the oldest messages are dead-lettered first
+        self.max_buffer = max_buffer
+        self.dead_letter_path = dead_letter_path
+        # Total messages accepted by this process, used to pace periodic agents
+        self.messages_enqueued = 0
+        self._buffer: list[dict] = []
+        # Batch currently being written; still visible to readers until it commits
+        self._flushing: list[dict] = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    def add(self, sender: str, content: str) -> dict:
+        """Validates and queues a message for persistence and returns it immediately."""
+        message = ConversationMessage(sender=sender, content=content).model_dump()
+        self._buffer.append(message)
+        self.messages_enqueued += 1
+        self._enforce_cap()
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+        return message
+
+    def pending(self, sender: str | None = None) -> list[dict]:
+        """Returns messages that are not yet committed, oldest first."""
+        messages = self._flushing + self._buffer
+        if sender:
+            messages = [m for m in messages if m["sender"] == sender]
+        return messages
+
+    def _enforce_cap(self):
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            for message in self._buffer[:overflow]:
+                self._dead_letter(message, "buffer full")
+            self._buffer = self._buffer[overflow:]
+
+    def _dead_letter(self, message: dict, reason):
+        print(f"❌ Dead-lettering conversation message {message['client_id']}: {reason}")
+        with open(self.dead_letter_path, "a") as f:
+            f.write(json.dumps({**message, "error": str(reason)}, default=str) + "\n")
+
+    async def _insert(self, messages: list[dict]):
+        async with AsyncSessionLocal() as session:
+            # Retrying a batch that did commit is harmless because client ids are unique
+            stmt = insert(ConversationHistory).values(messages).on_conflict_do_nothing(index_elements=["client_id"])
+            await session.execute(stmt)
+            await session.commit()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            self._flushing, self._buffer = self._buffer, []
+            try:
+                try:
+                    await self._insert(self._flushing)
+                    written = len(self._flushing)
+                except OUTAGE_ERRORS as e:
+                    # Keep the batch so the next flush retries it
+                    print(f"❌ Failed to flush {len(self._flushing)} conversation messages: {e}")
+                    self._buffer = self._flushing + self._buffer
+                    self._enforce_cap()
+                    return
+                except Exception as e:
+                    # Some row is bad: write the rows one at a time so only the bad ones are set aside
+                    print(f"⚠️ Batch of {len(self._flushing)} messages failed, retrying row by row: {e}")
+                    written, retry = 0, []
+                    for message in self._flushing:
+                        try:
+                            await self._insert([message])
+                            written += 1
+                        except OUTAGE_ERRORS:
+                            retry.append(message)
+                        except Exception as row_error:
+                            self._dead_letter(message, row_error)
+                    self._buffer = retry + self._buffer
+                if written:
+                    read_cache.invalidate("history")
+            finally:
+                self._flushing = []
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the background loop and writes out everything still buffered."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+        await self.flush()
+        # Whatever the database still refused is kept on disk rather than lost
+        for message in self._buffer:
+            self._dead_letter(message, "unsaved at shutdown")
+        self._buffer = []
+        print("✅ Conversation buffer flushed.")
+
+
+conversation_writer = ConversationWriter()
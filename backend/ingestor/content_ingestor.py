@@ -6,10 +6,18 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from pymilvus import connections, FieldSchema, CollectionSchema, DataType, Collection, MilvusClient
 
+from backend.retrieval.partitions import PartitionManager, partition_name
+from backend.retrieval.topic_map import TopicMap
+
+# Metadata fields used to filter scoped searches
+SCALAR_INDEX_FIELDS = ["source_type", "source_identifier"]
+
 
 class ContentIngestor:
-    def __init__(self, collection_name="learning_portal"):
+    def __init__(self, collection_name="learning_portal", topic_map: TopicMap | None = None):
         self.collection_name = collection_name
+        # Kept up to date with every ingested chunk
+        self.topic_map = topic_map
 
         # Load embedding model
         model_name = "sentence-transformers/all-mpnet-base-v2"
@@ -47,14 +55,35 @@ class ContentIngestor:
             print(f"✅ Collection '{self.collection_name}' created.")
         else:
             self.collection = Collection(self.collection_name)
-            if not self.collection.has_index():
+            # has_index() without a name is ambiguous once the scalar indexes exist
+            if not any(index.field_name == "embedding" for index in self.collection.indexes):
                 index_params = {"metric_type": "L2", "index_type": "IVF_FLAT", "params": {"nlist": 128}}
                 self.collection.create_index(field_name="embedding", index_params=index_params)
                 print(f"✅ Index for 'embedding' field created.")
             print(f"✅ Collection '{self.collection_name}' already exists.")
 
-        # Load the collection into memory for searching
-        self.collection.load()
+        self._ensure_scalar_indexes()
+        # Shared with the trainer so searches see new partitions without listing them
+        self.partitions = PartitionManager(self.collection)
+
+    def _ensure_scalar_indexes(self):
+        """Creates inverted indexes on the metadata fields so filtered searches don't scan them."""
+        for field in SCALAR_INDEX_FIELDS:
+            index_name = f"{field}_idx"
+            if not self.collection.has_index(index_name=index_name):
+                self.collection.create_index(field_name=field, index_name=index_name,
+                                             index_params={"index_type": "INVERTED"})
+                print(f"✅ Index for '{field}' field created.")
+
+    def _insert_chunks(self, data_to_insert, source_type: str):
+        """Inserts chunks into the partition for their source type, creating it if needed."""
+        name = partition_name(source_type)
+        self.partitions.add_partition(name)
+        result = self.collection.insert(data_to_insert, partition_name=name)
+        self.collection.flush()
+        if self.topic_map:
+            self.topic_map.add(result.primary_keys, [d["embedding"] for d in data_to_insert],
+                               [d["passage"] for d in data_to_insert])
 
     def _chunk_documents(self, docs):
         """Splits documents into smaller chunks."""
@@ -80,8 +109,7 @@ class ContentIngestor:
                     "embedding": embedding
                 })
 
-            self.collection.insert(data_to_insert)
-            self.collection.flush()
+            self._insert_chunks(data_to_insert, source_type="text")
             print(f"✅ Successfully ingested {len(data_to_insert)} chunks from pasted text.")
             return len(data_to_insert)
         except Exception as e:
@@ -111,8 +139,7 @@ class ContentIngestor:
                     "embedding": embedding
                 })
 
-            self.collection.insert(data_to_insert)
-            self.collection.flush()
+            self._insert_chunks(data_to_insert, source_type="pdf")
             print(f"✅ Successfully ingested {len(data_to_insert)} chunks from PDF.")
             return len(data_to_insert)
         except Exception as e:
@@ -0,0 +1,182 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from pydantic import BaseModel
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+import base64
+import json
+import uuid
+
+from backend.db.deps import get_db
+from backend.db.models import ConversationArchive, ConversationHistory, LearningTopic, Quiz
+from backend.read_cache import read_cache
+
+
+# --- Pydantic Models for the API ---
+class TopicResponse(BaseModel):
+    """Response model for a single topic."""
+    id: int
+    topic: str
+
+class TopicPage(BaseModel):
+    items: list[TopicResponse]
+    next_cursor: str | None = None
+
+class MessageResponse(BaseModel):
+    id: int
+    sender: str
+    content: str
+    timestamp: datetime | None = None
+
+class HistoryPage(BaseModel):
+    items: list[MessageResponse]
+    next_cursor: str | None = None
+
+class QuizSummaryResponse(BaseModel):
+    id: uuid.UUID
+    topic: str
+    created_at: datetime
+
+class QuizPage(BaseModel):
+    items: list[QuizSummaryResponse]
+    next_cursor: str | None = None
+
+
+# --- Cursor and conditional request helpers ---
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, types: tuple[type, ...]) -> list:
+    """Decodes a cursor and checks it holds one value of each expected type."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        values = None
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(values, types))):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return values
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since) >= last_modified
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def cached_page(request: Request, resource: str, params: tuple, load) -> Response:
+    """
+    Serves a listing page with ETag/Last-Modified validators, answering 304 when the client's copy
+    is current and only hitting the database when the page isn't cached for the current version.
+    """
+    version = read_cache.version(resource)
+    etag = read_cache.etag(resource, version, params)
+    last_modified = read_cache.last_modified(resource)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    payload = read_cache.get(resource, version, params)
+    if payload is None:
+        page = await load()
+        payload = page.model_dump(mode="json")
+        read_cache.put(resource, version, params, payload)
+    return JSONResponse(content=payload, headers=headers)
+
+
+# --- Router Setup ---
+router = APIRouter(tags=["Listings"])
+
+
+@router.get("/topics/", response_model=TopicPage)
+async def list_topics(request: Request, cursor: str | None = None, limit: int = Query(50, ge=1, le=100),
+                      db: AsyncSession = Depends(get_db)):
+    """
+    Lists learned topics alphabetically, one page at a time.
+    """
+    async def load():
+        stmt = select(LearningTopic).order_by(LearningTopic.topic).limit(limit + 1)
+        if cursor:
+            (after_topic,) = decode_cursor(cursor, (str,))
+            stmt = stmt.where(LearningTopic.topic > after_topic)
+        rows = (await db.execute(stmt)).scalars().all()
+
+        items = [TopicResponse(id=t.id, topic=t.topic) for t in rows[:limit]]
+        next_cursor = encode_cursor([items[-1].topic]) if len(rows) > limit else None
+        return TopicPage(items=items, next_cursor=next_cursor)
+
+    return await cached_page(request, "topics", (cursor, limit), load)
+
+
+@router.get("/history/", response_model=HistoryPage)
+async def list_history(request: Request, cursor: str | None = None, limit: int = Query(20, ge=1, le=100),
+                       db: AsyncSession = Depends(get_db)):
+    """
+    Lists conversation messages, newest first, one page at a time.
+    Archived messages keep their original ids, so both tables are paged as one sequence.
+    """
+    async def load():
+        branches = []
+        for model in (ConversationHistory, ConversationArchive):
+            branch = select(model.id, model.sender, model.content, model.timestamp)
+            if cursor:
+                (before_id,) = decode_cursor(cursor, (int,))
+                branch = branch.where(model.id < before_id)
+            # Each branch walks its primary key index and stops after one page
+            branches.append(branch.order_by(model.id.desc()).limit(limit + 1))
+        messages = union_all(*branches).subquery()
+        stmt = select(messages).order_by(messages.c.id.desc()).limit(limit + 1)
+        rows = (await db.execute(stmt)).all()
+
+        items = [
+            MessageResponse(id=m.id, sender=m.sender, content=m.content, timestamp=m.timestamp)
+            for m in rows[:limit]
+        ]
+        next_cursor = encode_cursor([items[-1].id]) if len(rows) > limit else None
+        return HistoryPage(items=items, next_cursor=next_cursor)
+
+    return await cached_page(request, "history", (cursor, limit), load)
+
+
+@router.get("/quizzes/", response_model=QuizPage)
+async def list_quizzes(request: Request, cursor: str | None = None, limit: int = Query(20, ge=1, le=100),
+                       db: AsyncSession = Depends(get_db)):
+    """
+    Lists past quizzes, newest first, one page at a time.
+    """
+    async def load():
+        stmt = select(Quiz).order_by(Quiz.created_at.desc(), Quiz.id.desc()).limit(limit + 1)
+        if cursor:
+            created_at, quiz_id = decode_cursor(cursor, (str, str))
+            try:
+                after = (datetime.fromisoformat(created_at), uuid.UUID(quiz_id))
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor.")
+            stmt = stmt.where(tuple_(Quiz.created_at, Quiz.id) < after)
+        rows = (await db.execute(stmt)).scalars().all()
+
+        items = [QuizSummaryResponse(id=q.id, topic=q.topic, created_at=q.created_at) for q in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor([items[-1].created_at.isoformat(), str(items[-1].id)])
+        return QuizPage(items=items, next_cursor=next_cursor)
+
+    return await cached_page(request, "quizzes", (cursor, limit), load)
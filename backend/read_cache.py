@@ -0,0 +1,61 @@
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+import hashlib
+
+
+def _now() -> datetime:
+    # HTTP dates have one-second resolution
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class ReadCache:
+    """
+    Small in-process cache for listing pages. Each resource has a version that writers bump
+    through `invalidate`, which also drives the ETag and Last-Modified headers.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, object] = OrderedDict()
+        self._versions: dict[str, int] = defaultdict(int)
+        # Nothing is known about writes before startup, so that is the earliest modification time
+        self._started = _now()
+        self._last_modified: dict[str, datetime] = {}
+
+    def version(self, resource: str) -> int:
+        return self._versions[resource]
+
+    def last_modified(self, resource: str) -> datetime:
+        return self._last_modified.get(resource, self._started)
+
+    def etag(self, resource: str, version: int, params: tuple) -> str:
+        # The start time keeps ETags from different server processes apart
+        raw = f"{self._started.timestamp()}:{resource}:{version}:{params}"
+        return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+    def get(self, resource: str, version: int, params: tuple):
+        key = (resource, version, params)
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+        return payload
+
+    def put(self, resource: str, version: int, params: tuple, payload):
+        key = (resource, version, params)
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, resource: str):
+        """Called after a write so cached pages and validators for the resource go stale."""
+        self._versions[resource] += 1
+        # Last-Modified has one-second resolution, so always move it forward or a write in the
+        # same second would leave If-Modified-Since clients with a stale 304
+        previous = self.last_modified(resource)
+        self._last_modified[resource] = max(_now(), previous + timedelta(seconds=1))
+        for key in [key for key in self._entries if key[0] == resource]:
+            del self._entries[key]
+
+
+read_cache = ReadCache()
@@ -0,0 +1,75 @@
+from pymilvus import Collection
+import asyncio
+import re
+import time
+
+# Chunks ingested before source partitions existed live in Milvus' default partition
+DEFAULT_PARTITION = "_default"
+
+
+def partition_name(source_type: str) -> str:
+    """Maps a source type to a valid Milvus partition name (letters, digits and underscores)."""
+    return "source_" + re.sub(r"[^0-9a-zA-Z_]", "_", source_type.strip().lower())
+
+
+class PartitionManager:
+    def __init__(self, collection: Collection, idle_seconds=600):
+        self.collection = collection
+        self.idle_seconds = idle_seconds
+        # Loaded partitions and when a search last used them
+        self._last_used: dict[str, float] = {}
+        # Partition names are listed once and kept current by add_partition
+        self._partitions = [p.name for p in collection.partitions]
+
+    def all_partitions(self) -> list[str]:
+        return list(self._partitions)
+
+    def add_partition(self, name: str):
+        """Creates a partition and records it without listing the collection again."""
+        if name not in self._partitions:
+            self.collection.create_partition(name)
+            self._partitions.append(name)
+            print(f"✅ Partition '{name}' created.")
+
+    def acquire(self, names: list[str]) -> list[str]:
+        """
+        Loads the requested partitions that aren't in memory yet and marks them as used.
+        Returns the subset of names that exist in the collection.
+        """
+        existing = set(self.all_partitions())
+        names = [name for name in names if name in existing]
+        to_load = [name for name in names if name not in self._last_used]
+        if to_load:
+            self.collection.load(partition_names=to_load)
+            print(f"✅ Loaded partitions: {', '.join(to_load)}")
+
+        now = time.monotonic()
+        for name in names:
+            self._last_used[name] = now
+        return names
+
+    async def borrow(self, names: list[str]) -> list[str]:
+        """
+        Loads partitions for a background scan without marking them as used by searches.
+        Returns the partitions it loaded, to be handed to `give_back`.
+        """
+        to_load = [name for name in names if name in self._partitions and name not in self._last_used]
+        if to_load:
+            await asyncio.to_thread(self.collection.load, partition_names=to_load)
+        return to_load
+
+    def give_back(self, borrowed: list[str]):
+        """Releases borrowed partitions again unless a search has started using them meanwhile."""
+        for name in borrowed:
+            if name not in self._last_used:
+                self.collection.partition(name).release()
+
+    def release_idle(self):
+        """Releases partitions that no search has used for `idle_seconds`."""
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = [name for name, last_used in self._last_used.items() if last_used < cutoff]
+        for name in idle:
+            self.collection.partition(name).release()
+            del self._last_used[name]
+        if idle:
+            print(f"Released idle partitions: {', '.join(idle)}")
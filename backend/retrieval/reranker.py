@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sentence_transformers import CrossEncoder
+import asyncio
+import threading
+import time
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", top_n=3,
+                 latency_budget_ms=300, cache_size=10000, max_pending=4):
+        # Small cross-encoder that scores (query, passage) pairs on CPU
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.top_n = top_n
+        self.latency_budget = latency_budget_ms / 1000
+        self.cache_size = cache_size
+        # Scoring gets its own thread so it never competes with the to_thread Gemini calls
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        # Scoring jobs that haven't finished, including ones whose request already fell back
+        self.max_pending = max_pending
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        # The scoring thread and the event loop both touch the cache
+        self._cache_lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, int], float] = OrderedDict()
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _cache_put_many(self, items):
+        with self._cache_lock:
+            for key, score in items:
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _score(self, query: str, candidates: list[tuple[int, str]]):
+        """Scores all uncached pairs in a single batch and stores them in the cache."""
+        pairs = [(query, passage) for _, passage in candidates]
+        scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        self._cache_put_many([((query, passage_id), float(score))
+                              for (passage_id, _), score in zip(candidates, scores)])
+
+    def _forget(self, key, job):
+        if self._in_flight.get(key) is job:
+            del self._in_flight[key]
+        if not job.cancelled():
+            # Mark a failure as retrieved even if every waiter already gave up
+            job.exception()
+
+    async def rerank(self, query: str, candidates: list[tuple[int, str]]) -> list[str]:
+        """
+        Reorders first-stage (passage_id, passage) candidates by cross-encoder score and
+        returns the best passages. Falls back to first-stage order if the budget is exceeded.
+        """
+        if not candidates:
+            return []
+        first_stage = [passage for _, passage in candidates[:self.top_n]]
+
+        missing = [c for c in candidates if self._cache_get((query, c[0])) is None]
+        if missing:
+            # Identical concurrent queries wait on the same job instead of rescoring
+            key = (query, tuple(passage_id for passage_id, _ in missing))
+            job = self._in_flight.get(key)
+            if job is None:
+                if len(self._in_flight) >= self.max_pending:
+                    print("⚠️ Reranker is backlogged, using first-stage order.")
+                    return first_stage
+                job = asyncio.get_running_loop().run_in_executor(self._executor, self._score, query, missing)
+                self._in_flight[key] = job
+                job.add_done_callback(lambda j: self._forget(key, j))
+
+            start = time.perf_counter()
+            try:
+                # The job keeps running after a timeout so its scores still warm the cache
+                await asyncio.wait_for(asyncio.shield(job), timeout=self.latency_budget)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Reranker exceeded {self.latency_budget * 1000:.0f} ms budget, "
+                      f"using first-stage order.")
+                return first_stage
+            except Exception as e:
+                print(f"❌ Reranker failed, using first-stage order: {e}")
+                return first_stage
+            print(f"Reranked {len(missing)} passages in {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+        with self._cache_lock:
+            scored = [(self._cache.get((query, passage_id), float("-inf")), passage)
+                      for passage_id, passage in candidates]
+        scored.sort(key=lambda s: s[0], reverse=True)
+        return [passage for _, passage in scored[:self.top_n]]
@@ -0,0 +1,283 @@
+from collections import Counter
+from pymilvus import Collection
+import math
+import re
+import threading
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9\-]{2,}")
+STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "had", "her", "was", "one",
+    "our", "out", "has", "have", "his", "how", "its", "may", "new", "now", "see", "two", "who", "did",
+    "use", "used", "using", "this", "that", "with", "from", "they", "been", "were", "which", "their",
+    "there", "these", "those", "into", "than", "then", "them", "also", "such", "each", "more", "most",
+    "other", "some", "what", "when", "where", "will", "would", "could", "should", "about", "between",
+    "while", "because", "through", "over", "only", "both", "very", "just", "like", "does", "here",
+    "http", "https", "www", "com", "org", "et", "al", "fig", "figure", "table", "page", "arxiv",
+}
+
+QUESTION_TEMPLATES = [
+    "Can you explain {a} and how it relates to {b}?",
+    "What role does {a} play in {b}?",
+    "What should I know about {a}?",
+    "How do {a} and {b} fit together?",
+]
+
+
+def squared_distances(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Pairwise squared L2 distances between rows of x and the centroids."""
+    distances = (
+        np.einsum("ij,ij->i", x, x)[:, None]
+        - 2 * x @ centroids.T
+        + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+    )
+    # The expansion can dip slightly below zero from rounding
+    return np.maximum(distances, 0)
+
+
+def kmeans(x: np.ndarray, k: int, iterations=25, seed=0) -> np.ndarray:
+    """Lloyd's k-means with k-means++ seeding; returns the centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = [x[rng.integers(len(x))]]
+    closest = squared_distances(x, np.array(centroids))[:, 0]
+    for _ in range(1, k):
+        weights = closest.astype(np.float64)
+        probabilities = weights / weights.sum() if weights.sum() > 0 else None
+        centroids.append(x[rng.choice(len(x), p=probabilities)])
+        closest = np.minimum(closest, squared_distances(x, centroids[-1][None, :])[:, 0])
+    centroids = np.array(centroids)
+
+    for _ in range(iterations):
+        assignments = squared_distances(x, centroids).argmin(axis=1)
+        counts = np.bincount(assignments, minlength=k).astype(np.float32)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, x)
+        # Empty clusters keep their previous centroid
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+    return centroids
+
+
+def tokenize(passage: str) -> set[str]:
+    return {t for t in TOKEN_PATTERN.findall(passage.lower()) if t not in STOPWORDS}
+
+
+class _Clusters:
+    """Snapshot of the topic map, replaced as a whole so readers never see a half-built map."""
+
+    def __init__(self, centroids, counts, representatives, representative_distances, term_counts, doc_freq):
+        self.centroids = centroids
+        self.counts = counts
+        self.representatives = representatives
+        self.representative_distances = representative_distances
+        # Per-cluster and corpus-wide document frequencies of terms, used for the labels
+        self.term_counts = term_counts
+        self.doc_freq = doc_freq
+        self.labels = [self._label(c) for c in range(len(centroids))]
+
+    def _label(self, cluster: int, n_terms=3) -> list[str]:
+        total_docs = max(int(self.counts.sum()), 1)
+        size = max(int(self.counts[cluster]), 1)
+        scores = {
+            term: count / size * math.log(total_docs / self.doc_freq[term])
+            for term, count in self.term_counts[cluster].items()
+        }
+        # Terms found in every chunk say nothing about this cluster
+        terms = [term for term in scores if scores[term] > 0]
+        return sorted(terms, key=scores.get, reverse=True)[:n_terms]
+
+    def relabel(self, clusters):
+        for c in clusters:
+            self.labels[c] = self._label(c)
+
+
+class TopicMap:
+    """
+    Clusters the corpus embeddings into topics so next-step suggestions can be picked
+    without an LLM call. Built once from Milvus and updated incrementally as content is ingested.
+    """
+
+    def __init__(self, n_clusters=24, max_points=20000, rebuild_ratio=0.5):
+        self.n_clusters = n_clusters
+        # Larger corpora are subsampled for fitting, then every chunk is assigned
+        self.max_points = max_points
+        # Trigger a full rebuild once this fraction of the map was added incrementally
+        self.rebuild_ratio = rebuild_ratio
+        self._clusters: _Clusters | None = None
+        self._added_since_build = 0
+        # Chunks ingested while a rebuild runs, replayed onto the new snapshot unless the scan read them
+        self._added_during_rebuild: list[tuple] | None = None
+        # Rebuilds run in a worker thread while ingestion updates the map on the event loop
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._clusters is not None
+
+    @property
+    def needs_rebuild(self) -> bool:
+        if self._clusters is None:
+            return self._added_since_build > 0
+        return self._added_since_build > self.rebuild_ratio * self._clusters.counts.sum()
+
+    def build(self, embeddings, passages: list[str], scanned_ids: set[int] | None = None):
+        """
+        Fits the map to the given chunks. `scanned_ids` are the primary keys they were read with,
+        so chunks ingested during the rebuild are only replayed if the scan didn't include them.
+        """
+        x = np.asarray(embeddings, dtype=np.float32)
+        k = min(self.n_clusters, len(x))
+        if k == 0:
+            with self._lock:
+                self._added_during_rebuild = None
+            return
+        rng = np.random.default_rng(0)
+        sample = x if len(x) <= self.max_points else x[rng.choice(len(x), self.max_points, replace=False)]
+        centroids = kmeans(sample, k)
+
+        assignments = np.empty(len(x), dtype=np.int64)
+        distances = np.empty(len(x), dtype=np.float32)
+        for start in range(0, len(x), 4096):
+            d = squared_distances(x[start:start + 4096], centroids)
+            assignments[start:start + 4096] = d.argmin(axis=1)
+            distances[start:start + 4096] = d.min(axis=1)
+
+        representatives, representative_distances = [], np.full(k, np.inf, dtype=np.float32)
+        for c in range(k):
+            members = np.flatnonzero(assignments == c)
+            if len(members):
+                best = members[distances[members].argmin()]
+                representatives.append(passages[best])
+                representative_distances[c] = distances[best]
+            else:
+                representatives.append("")
+
+        term_counts, doc_freq = [Counter() for _ in range(k)], Counter()
+        for passage, c in zip(passages, assignments):
+            terms = tokenize(passage)
+            term_counts[c].update(terms)
+            doc_freq.update(terms)
+
+        counts = np.bincount(assignments, minlength=k).astype(np.float32)
+        clusters = _Clusters(centroids, counts, representatives, representative_distances, term_counts, doc_freq)
+
+        scanned_ids = scanned_ids or set()
+        with self._lock:
+            replayed = 0
+            for added_ids, added_embeddings, added_passages in self._added_during_rebuild or []:
+                keep = [i for i, pk in enumerate(added_ids) if pk not in scanned_ids]
+                if keep:
+                    self._apply(clusters, [added_embeddings[i] for i in keep], [added_passages[i] for i in keep])
+                    replayed += len(keep)
+            self._clusters = clusters
+            self._added_since_build = replayed
+            self._added_during_rebuild = None
+        print(f"✅ Topic map built: {k} clusters over {len(x)} chunks, {replayed} chunks replayed.")
+
+    def rebuild_from_collection(self, collection: Collection, partition_names: list[str], batch_size=1000):
+        """
+        Reads every chunk embedding from the given (already loaded) partitions and rebuilds the map.
+        Chunks added while this runs are replayed onto the rebuilt map unless the scan already read them.
+        """
+        with self._lock:
+            self._added_during_rebuild = []
+        try:
+            iterator = collection.query_iterator(
+                batch_size=batch_size,
+                expr="id >= 0",
+                output_fields=["id", "passage", "embedding"],
+                partition_names=partition_names,
+            )
+            ids, embeddings, passages = set(), [], []
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    iterator.close()
+                    break
+                ids.update(row["id"] for row in batch)
+                embeddings.extend(row["embedding"] for row in batch)
+                passages.extend(row["passage"] for row in batch)
+            self.build(embeddings, passages, scanned_ids=ids)
+        finally:
+            with self._lock:
+                self._added_during_rebuild = None
+
+    def add(self, ids: list[int], embeddings, passages: list[str]):
+        """
+        Assigns newly ingested chunks to their nearest clusters and moves those centroids.
+        `ids` are the chunks' Milvus primary keys.
+        """
+        if not passages:
+            return
+        with self._lock:
+            self._added_since_build += len(passages)
+            if self._added_during_rebuild is not None:
+                self._added_during_rebuild.append((list(ids), embeddings, passages))
+            if self._clusters is not None:
+                self._apply(self._clusters, embeddings, passages)
+
+    @staticmethod
+    def _apply(clusters: _Clusters, embeddings, passages: list[str]):
+        x = np.asarray(embeddings, dtype=np.float32)
+        d = squared_distances(x, clusters.centroids)
+        assignments = d.argmin(axis=1)
+
+        # Running-mean update of each touched centroid
+        added = np.bincount(assignments, minlength=len(clusters.centroids)).astype(np.float32)
+        sums = np.zeros_like(clusters.centroids)
+        np.add.at(sums, assignments, x)
+        new_counts = clusters.counts + added
+        touched = added > 0
+        clusters.centroids[touched] += (
+            sums[touched] - added[touched, None] * clusters.centroids[touched]
+        ) / new_counts[touched, None]
+        clusters.counts = new_counts
+
+        for i, (passage, c) in enumerate(zip(passages, assignments)):
+            terms = tokenize(passage)
+            clusters.term_counts[c].update(terms)
+            clusters.doc_freq.update(terms)
+            if d[i, c] < clusters.representative_distances[c]:
+                clusters.representatives[c] = passage
+                clusters.representative_distances[c] = d[i, c]
+        clusters.relabel(np.flatnonzero(touched))
+
+    def suggest(self, query_embedding, explored_embeddings, n=4) -> list[str]:
+        """
+        Returns questions about the clusters nearest to the query that the learner hasn't explored yet.
+        Clusters nearest to the query itself and to each learned topic count as explored.
+        """
+        clusters = self._clusters
+        if clusters is None:
+            return []
+
+        query_distances = squared_distances(np.asarray([query_embedding], dtype=np.float32),
+                                            clusters.centroids)[0]
+        explored = {int(query_distances.argmin())}
+        if len(explored_embeddings):
+            topic_distances = squared_distances(np.asarray(explored_embeddings, dtype=np.float32),
+                                                clusters.centroids)
+            explored.update(int(c) for c in topic_distances.argmin(axis=1))
+
+        order = [int(c) for c in query_distances.argsort() if clusters.counts[c] > 0]
+        # A small corpus may have fewer unexplored clusters than suggestions
+        candidates = [c for c in order if c not in explored] + [c for c in order if c in explored]
+
+        # Clusters with the same label would produce the same question
+        picks, seen = [], set()
+        for c in candidates:
+            label = frozenset(clusters.labels[c][:2])
+            if label not in seen:
+                seen.add(label)
+                picks.append(c)
+            if len(picks) == n:
+                break
+
+        suggestions = []
+        for i, c in enumerate(picks):
+            terms = clusters.labels[c] or ["this topic"]
+            template = QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)]
+            suggestions.append(template.format(a=terms[0], b=terms[1] if len(terms) > 1 else "the course material"))
+        return suggestions
@@ -36,8 +36,17 @@ const QuizComponent = () => {
     useEffect(() => {
         const fetchTopics = async () => {
             try {
-                const response = await axios.get('http://127.0.0.1:8000/topics/');
-                setTopics(response.data);
+                // Topics are paginated; follow the cursor until every page is loaded
+                const allTopics: Topic[] = [];
+                let cursor: string | null = null;
+                do {
+                    const response = await axios.get('http://127.0.0.1:8000/topics/', {
+                        params: cursor ? { cursor, limit: 100 } : { limit: 100 },
+                    });
+                    allTopics.push(...response.data.items);
+                    cursor = response.data.next_cursor;
+                } while (cursor);
+                setTopics(allTopics);
             } catch (error) {
                 console.error("Failed to fetch topics:", error);
             }
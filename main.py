@@ -1,63 +1,128 @@
-from fastapi import Body, Depends, FastAPI, UploadFile, File, HTTPException
+from fastapi import Body, Depends, FastAPI, UploadFile, File, HTTPException, Query
 from pydantic import BaseModel
+import asyncio
 import shutil
 import os
 import dotenv
 from pymilvus import connections, Collection, MilvusClient
-from sqlalchemy.future import select
 
+from backend.agents.compaction_agent import CompactionAgent
 from backend.agents.learning_navigator_agent import LearningNavigatorAgent
 from backend.agents.summay_agent import SummaryAgent
 from backend.agents.trainer_agent import TrainerAgent
+from backend.retrieval.reranker import CrossEncoderReranker
+from backend.retrieval.topic_map import TopicMap
 from backend.ingestor.content_ingestor import ContentIngestor
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from backend.db.database import AsyncSessionLocal, engine, Base
-from backend.db.models import ConversationHistory, LearningTopic
+from backend.db.write_behind import conversation_writer
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend import assessment_router
+from backend import assessment_router, listing_router
+from backend.admission import AdmissionController, SingleFlight, normalize_key
 
 # This section runs once when the app starts
 dotenv.load_dotenv()
 
+# Map of the corpus' topics, used for LLM-free next-step suggestions
+topic_map = TopicMap()
+
 # Initialize our ingestor
 # This creates a single instance that lives as long as the API server is running
-ingestor = ContentIngestor()
+ingestor = ContentIngestor(topic_map=topic_map)
 
 # Connect to Milvus
 client = MilvusClient()
 connections.connect()
 milvus_collection = Collection("learning_portal")
-milvus_collection.load()
 
 # Instantiate agents
-trainer_agent = TrainerAgent(milvus_collection=milvus_collection)
-summary_agent = SummaryAgent()
-navigator_agent = LearningNavigatorAgent()
+# Two-stage retrieval is opt-in: set ENABLE_RERANKER=true to rerank Milvus candidates locally
+reranker = None
+if os.getenv("ENABLE_RERANKER", "false").lower() == "true":
+    reranker = CrossEncoderReranker(latency_budget_ms=int(os.getenv("RERANKER_BUDGET_MS", "300")))
+trainer_agent = TrainerAgent(milvus_collection=milvus_collection, reranker=reranker,
+                             partitions=ingestor.partitions)
+
+# Identical concurrent questions share one Trainer Agent call, and Gemini-bound work is bounded:
+# chat answers and suggestions share one budget, summaries and compaction another
+chat_flight = SingleFlight()
+chat_admission = AdmissionController("chat", max_concurrent=4, max_queue=16, max_wait_seconds=30,
+                                     initial_service_time=15)
+background_admission = AdmissionController("background", max_concurrent=2, max_queue=4, max_wait_seconds=60,
+                                           initial_service_time=5)
+
+summary_agent = SummaryAgent(admission=background_admission)
+# Set NAVIGATOR_MODE=llm to have Gemini write the suggestions instead of the topic map
+navigator_agent = LearningNavigatorAgent(topic_map=topic_map, embedding_model=trainer_agent.embedding_model,
+                                         embed_query=trainer_agent.embed_query,
+                                         use_llm=os.getenv("NAVIGATOR_MODE", "topic_map") == "llm",
+                                         admission=chat_admission)
+compaction_agent = CompactionAgent(admission=background_admission)
 from backend.db.deps import get_db
 
 
+async def release_idle_partitions():
+    """Periodically frees memory held by partitions that scoped searches no longer use."""
+    while True:
+        await asyncio.sleep(60)
+        trainer_agent.partitions.release_idle()
+
+
+topic_map_task: asyncio.Task | None = None
+
+
+async def rebuild_topic_map():
+    # The scan borrows partitions so it doesn't keep them loaded for searches
+    partitions = trainer_agent.partitions
+    names = partitions.all_partitions()
+    borrowed = []
+    try:
+        borrowed = await partitions.borrow(names)
+        await asyncio.to_thread(topic_map.rebuild_from_collection, milvus_collection, names)
+    except Exception as e:
+        print(f"❌ Failed to build topic map: {e}")
+    finally:
+        partitions.give_back(borrowed)
+
+
+def schedule_topic_map_rebuild():
+    """Rebuilds the topic map in the background unless a rebuild is already running."""
+    global topic_map_task
+    if topic_map_task is None or topic_map_task.done():
+        topic_map_task = asyncio.create_task(rebuild_topic_map())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all doesn't add columns to existing tables...
+        await conn.execute(text("ALTER TABLE conversation_history ADD COLUMN IF NOT EXISTS client_id UUID UNIQUE"))
+        # ...nor indexes to them
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quizzes_created_at_id ON quizzes (created_at, id)"))
     print("✅ Database tables created.")
+    release_task = asyncio.create_task(release_idle_partitions())
+    conversation_writer.start()
+    schedule_topic_map_rebuild()
     yield
+    release_task.cancel()
+    # Make sure buffered conversation messages reach the database before exiting
+    await conversation_writer.stop()
 
 app = FastAPI(title="Personal Learning Portal API", lifespan=lifespan)
 
 app.include_router(assessment_router.router)
+app.include_router(listing_router.router)
 
 @app.post("/add-message/")
-async def add_message(content: str, sender: str, db: AsyncSession = Depends(get_db)):
+async def add_message(content: str, sender: str = Query(min_length=1, max_length=50)):
     """
     An example endpoint to add a new message to the conversation history.
+    The message is buffered and written in the next batch.
     """
-    new_message = ConversationHistory(sender=sender, content=content)
-    db.add(new_message)
-    await db.commit()
-    await db.refresh(new_message)
-    return new_message
+    return conversation_writer.add(sender=sender, content=content)
 
 
 app.add_middleware(
@@ -84,6 +149,8 @@ async def ingest_text(request: TextIngestRequest = Body(...)):
 
     try:
         chunks_ingested = ingestor.ingest_text(request.text, request.source_identifier)
+        if topic_map.needs_rebuild:
+            schedule_topic_map_rebuild()
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error ingesting text: {str(e)}")
 
@@ -109,6 +176,8 @@ async def ingest_pdf(file: UploadFile = File(...)):
         shutil.copyfileobj(file.file, buffer)
 
     chunks_ingested = ingestor.ingest_pdf(file_path)
+    if topic_map.needs_rebuild:
+        schedule_topic_map_rebuild()
 
     # Clean up the temporary file
     os.remove(file_path)
@@ -121,6 +190,9 @@ async def ingest_pdf(file: UploadFile = File(...)):
 class ChatRequest(BaseModel):
     """Request model for a user's chat message."""
     content: str
+    # Optional retrieval scope, e.g. source_type="pdf" and source_identifier="attention.pdf"
+    source_type: str | None = None
+    source_identifier: str | None = None
 
 class ChatResponse(BaseModel):
     """Response model for the AI's answer and suggestions."""
@@ -134,53 +206,44 @@ async def handle_chat(request: ChatRequest, db: AsyncSession = Depends(get_db)):
     Main endpoint to handle a user's chat message.
     """
     try:
-        # 1. Save the user's message to the database
-        user_message = ConversationHistory(sender="user", content=request.content)
-        db.add(user_message)
-        await db.commit()
-        await db.refresh(user_message)
-
-        # 2. Get the AI's answer using the Trainer Agent
+        # 1. Get the AI's answer using the Trainer Agent
         print("Getting response from Trainer Agent...")
-        ai_answer = await trainer_agent.answer_query(db=db, user_query=request.content)
-
-        # 3. Save the AI's response to the database
-        ai_message = ConversationHistory(sender="portal", content=ai_answer)
-        db.add(ai_message)
-        await db.commit()
-        await db.refresh(ai_message)
-
-        # 4. Get next-step suggestions from the Learning Navigator
+        async def answer():
+            # Coalesced callers share this computation, so it can't borrow the leader's
+            # request-scoped session, which is closed if the leader disconnects
+            async with chat_admission.admit(), AsyncSessionLocal() as answer_db:
+                return await trainer_agent.answer_query(db=answer_db, user_query=request.content,
+                                                        source_type=request.source_type,
+                                                        source_identifier=request.source_identifier)
+
+        key = (normalize_key(request.content), request.source_type, request.source_identifier)
+        ai_answer = await chat_flight.do(key, answer)
+
+        # 2. Queue both messages for the database only once the request was admitted and answered,
+        # so a rejected request leaves no unanswered turn in the history
+        previous_count = conversation_writer.messages_enqueued
+        conversation_writer.add(sender="user", content=request.content)
+        conversation_writer.add(sender="portal", content=ai_answer)
+
+        # 3. Get next-step suggestions from the Learning Navigator
         print("Getting suggestions from Navigator Agent...")
-        suggestions = await navigator_agent.suggest_next_steps(db=db)
-
-        # 5. Check if we should trigger the Summary Agent
-        result = await db.execute(select(ConversationHistory))
-        total_messages = len(result.scalars().all())
+        suggestions = await navigator_agent.suggest_next_steps(db=db, user_query=request.content)
 
-        if total_messages % 10 == 0:  # Trigger every 10 messages
+        # 4. Check if we should trigger the Summary Agent
+        if previous_count // 10 != conversation_writer.messages_enqueued // 10:  # Trigger every 10 messages
             print("Triggering Summary Agent in the background...")
             await summary_agent.summarize_conversation(db=db)
 
+        # 5. Fold old messages into the rolling summary in the background once enough have piled up
+        compaction_agent.schedule()
+
         return ChatResponse(answer=ai_answer, suggestions=suggestions)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"An error occurred in the chat endpoint: {e}")
         raise HTTPException(status_code=500, detail="An internal error occurred.")
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Personal Learning Portal API!"}
-
-class TopicResponse(BaseModel):
-    """Response model for a single topic."""
-    id: int
-    topic: str
-
-@app.get("/topics/", response_model=list[TopicResponse])
-async def get_all_topics(db: AsyncSession = Depends(get_db)):
-    """
-    Fetches all unique topics from the learning_topics table.
-    """
-    result = await db.execute(select(LearningTopic).order_by(LearningTopic.topic))
-    topics = result.scalars().all()
-    return topics
\ No newline at end of file